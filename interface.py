@@ -2,78 +2,242 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from collections import Counter
 import heapq
+import hashlib
 from io import StringIO, BytesIO
 import time
 import numpy as np
 
+try:
+    import numba
+    USE_NUMBA = True
+except ImportError:
+    USE_NUMBA = False
+
+
+def _njit(func):
+    # compila com Numba quando disponível; caso contrário roda em Python puro
+    return numba.njit(cache=True)(func) if USE_NUMBA else func
+
 # ====================================================
 # Huffman (opera sobre BYTES para ser mais robusto)
 # ====================================================
-class HuffmanNode:
-    def __init__(self, byte_val, freq):
-        self.byte_val = byte_val  # None para nó interno, caso contrário 0-255
-        self.freq = freq
-        self.left = None
-        self.right = None
+# acima desta entropia (bits/byte) o Huffman praticamente não reduz o tamanho
+ENTROPY_STORE_THRESHOLD = 7.5
 
-    def __lt__(self, other):
-        return self.freq < other.freq
 
+def byte_counts(data_bytes: bytes) -> np.ndarray:
+    # histograma dos 256 valores de byte em uma única chamada vetorizada
+    return np.bincount(np.frombuffer(data_bytes, np.uint8), minlength=256)
 
-def build_huffman_tree_from_bytes(data_bytes: bytes):
-    freq = Counter(data_bytes)
-    heap = [HuffmanNode(b, f) for b, f in freq.items()]
-    heapq.heapify(heap)
-    if not heap:
+
+def build_huffman_tree_from_bytes(data_bytes: bytes, counts: np.ndarray = None):
+    if counts is None:
+        counts = byte_counts(data_bytes)
+    freq_items = [(int(b), int(c)) for b, c in enumerate(counts) if c]
+    if not freq_items:
         return None
+    # árvore em arrays paralelos (nó i: filhos left[i]/right[i], byte_of[i] nas folhas);
+    # o heap guarda tuplas (freq, nó), comparadas em C (o índice do nó desempata)
+    left = np.full(512, -1, np.int16)
+    right = np.full(512, -1, np.int16)
+    byte_of = np.full(512, -1, np.int16)
+    heap = []
+    for idx, (b, f) in enumerate(freq_items):
+        byte_of[idx] = b
+        heap.append((f, idx))
+    heapq.heapify(heap)
+    next_idx = len(heap)
     while len(heap) > 1:
-        left = heapq.heappop(heap)
-        right = heapq.heappop(heap)
-        merged = HuffmanNode(None, left.freq + right.freq)
-        merged.left = left
-        merged.right = right
-        heapq.heappush(heap, merged)
-    return heap[0]
-
-
-def build_codes_from_tree(root):
-    codes = {}
-    def walk(node, prefix):
-        if node is None:
-            return
-        if node.byte_val is not None:
-            codes[node.byte_val] = prefix or "0"  # handle single-symbol case
-            return
-        walk(node.left, prefix + "0")
-        walk(node.right, prefix + "1")
-    walk(root, "")
-    return codes
+        lf, l = heapq.heappop(heap)
+        rf, r = heapq.heappop(heap)
+        left[next_idx] = l
+        right[next_idx] = r
+        heapq.heappush(heap, (lf + rf, next_idx))
+        next_idx += 1
+    return heap[0][1], left, right, byte_of
+
+
+def build_codes_from_tree(tree):
+    root, left, right, byte_of = tree
+    # percorre a árvore iterativamente só para obter o comprimento do código de cada byte
+    code_lens = np.zeros(256, np.uint8)
+    stack = [(root, 0)]
+    while stack:
+        node, depth = stack.pop()
+        if byte_of[node] >= 0:
+            code_lens[byte_of[node]] = max(depth, 1)  # handle single-symbol case
+            continue
+        stack.append((left[node], depth + 1))
+        stack.append((right[node], depth + 1))
+
+    # códigos canônicos: símbolos ordenados por (comprimento, byte), códigos consecutivos
+    code_vals = np.zeros(256, np.uint64)
+    symbols = sorted(np.flatnonzero(code_lens).tolist(), key=lambda b: (code_lens[b], b))
+    code = 0
+    for i, b in enumerate(symbols):
+        code_vals[b] = code
+        if i + 1 < len(symbols):
+            code = (code + 1) << int(code_lens[symbols[i + 1]] - code_lens[b])
+    return code_vals, code_lens
+
+
+def pack_codes(data_bytes: bytes, code_vals: np.ndarray, code_lens: np.ndarray):
+    arr = np.frombuffer(data_bytes, np.uint8)
+    lens = code_lens[arr].astype(np.int64)
+    vals = code_vals[arr]
+    offsets = np.concatenate(([0], np.cumsum(lens)))[:-1]
+    total_bits = int(lens.sum())
+    # expande para um array de bits (1 byte por bit) e compacta com packbits;
+    # itera por posição dentro do código (no máximo max_len passadas vetorizadas)
+    bits = np.zeros(total_bits, np.uint8)
+    for k in range(int(lens.max())):
+        sel = lens > k
+        shift = (lens[sel] - 1 - k).astype(np.uint64)
+        bits[offsets[sel] + k] = (vals[sel] >> shift) & np.uint64(1)
+    return np.packbits(bits).tobytes(), total_bits
+
+
+@_njit
+def _encode_nb(data, code_vals, code_lens, out):
+    # registrador de bits: acc guarda os nacc bits ainda não escritos (< 8 após cada flush)
+    acc = 0
+    nacc = 0
+    pos = 0
+    for i in range(len(data)):
+        c = np.int64(code_vals[data[i]])
+        length = np.int64(code_lens[data[i]])
+        while length > 0:
+            take = min(length, 48)  # mantém acc abaixo de 63 bits
+            length -= take
+            acc = (acc << take) | ((c >> length) & ((1 << take) - 1))
+            nacc += take
+            while nacc >= 8:
+                nacc -= 8
+                out[pos] = (acc >> nacc) & 0xFF
+                pos += 1
+            acc &= (1 << nacc) - 1
+    if nacc > 0:
+        out[pos] = (acc << (8 - nacc)) & 0xFF
+        pos += 1
+    return pos
 
 
 def huffman_compress_bytes(data_bytes: bytes):
+    _warm_up_numba()
     start = time.perf_counter()
-    root = build_huffman_tree_from_bytes(data_bytes)
-    if root is None:
-        return "", {}, 0.0
-    codes = build_codes_from_tree(root)
-    # encode
-    encoded_bits = "".join(codes[b] for b in data_bytes)
+    # entrada quase uniforme (já comprimida, base64...): armazena sem codificar
+    counts = byte_counts(data_bytes)
+    n = len(data_bytes)
+    p = counts[counts > 0] / max(n, 1)
+    entropy = float(-(p * np.log2(p)).sum())
+    if entropy > ENTROPY_STORE_THRESHOLD:
+        return data_bytes, 8 * n, None, time.perf_counter() - start
+    tree = build_huffman_tree_from_bytes(data_bytes, counts)
+    if tree is None:
+        return b"", 0, None, 0.0
+    code_vals, code_lens = build_codes_from_tree(tree)
+    # encode (tabelas + bitpacking, sem strings '0'/'1' por byte): laço compilado
+    # com Numba quando disponível, senão passadas vetorizadas em NumPy
+    if USE_NUMBA:
+        nbits = int((counts * code_lens).sum())
+        out = np.empty((nbits + 7) // 8, np.uint8)
+        _encode_nb(np.frombuffer(data_bytes, np.uint8), code_vals, code_lens, out)
+        bit_buffer = out.tobytes()
+    else:
+        bit_buffer, nbits = pack_codes(data_bytes, code_vals, code_lens)
     comp_time = time.perf_counter() - start
-    return encoded_bits, codes, comp_time
-
-
-def huffman_decompress_bits(encoded_bits: str, codes: dict):
+    return bit_buffer, nbits, (code_vals, code_lens), comp_time
+
+
+def build_decode_tables(code_vals: np.ndarray, code_lens: np.ndarray):
+    # trie dos códigos: child[nó, bit] > 0 é nó interno, < 0 é folha (símbolo = -v - 1),
+    # 0 = ainda não alocado (a raiz nunca é filha de ninguém)
+    symbols = np.flatnonzero(code_lens)
+    child = np.zeros((max(len(symbols) - 1, 1), 2), np.int32)
+    n_nodes = 1
+    for b in symbols.tolist():
+        length, val = int(code_lens[b]), int(code_vals[b])
+        node = 0
+        for k in range(length - 1, 0, -1):
+            bit = (val >> k) & 1
+            if child[node, bit] == 0:
+                child[node, bit] = n_nodes
+                n_nodes += 1
+            node = child[node, bit]
+        child[node, val & 1] = -b - 1
+
+    # tabela estilo nghttp2: para cada estado (nó interno) e cada byte de entrada,
+    # os símbolos emitidos (no máximo 8) e o estado resultante
+    n_states = child.shape[0]
+    byte = np.broadcast_to(np.arange(256), (n_states, 256))
+    state = np.repeat(np.arange(n_states), 256).reshape(n_states, 256)
+    emit_count = np.zeros((n_states, 256), np.uint8)
+    emit_syms = np.zeros((n_states, 256, 8), np.uint8)
+    for k in range(7, -1, -1):
+        nxt = child[state, (byte >> k) & 1]
+        leaf = nxt < 0
+        s_idx, b_idx = np.nonzero(leaf)
+        emit_syms[s_idx, b_idx, emit_count[leaf]] = -nxt[leaf] - 1
+        emit_count[leaf] += 1
+        state = np.where(leaf, 0, nxt)
+    # tabelas achatadas (índice state * 256 + byte) servem tanto ao Numba quanto a listas
+    return child, state.ravel().astype(np.int32), emit_count.ravel(), emit_syms.ravel()
+
+
+@_njit
+def _decode_table_loop(data, next_state, emit_count, emit_syms, out):
+    state = 0
+    n = 0
+    for i in range(len(data)):
+        idx = state * 256 + data[i]
+        for j in range(emit_count[idx]):
+            out[n] = emit_syms[idx * 8 + j]
+            n += 1
+        state = next_state[idx]
+    return state, n
+
+
+def _warm_up_numba():
+    # carrega/compila os laços Numba (a cada rerun o Streamlit cria dispatchers novos)
+    # fora das medições de tempo; os tipos espelham as chamadas reais
+    if not USE_NUMBA:
+        return
+    data = np.frombuffer(b"\0", np.uint8)
+    _encode_nb(data, np.zeros(256, np.uint64), np.zeros(256, np.uint8), np.zeros(1, np.uint8))
+    _decode_table_loop(data, np.zeros(256, np.int32), np.zeros(256, np.uint8),
+                       np.zeros(256 * 8, np.uint8), np.zeros(1, np.uint8))
+
+
+def huffman_decompress_bits(bit_buffer: bytes, nbits: int, codes: tuple):
+    _warm_up_numba()
     start = time.perf_counter()
-    reverse_map = {v: k for k, v in codes.items()}
-    decoded_bytes = bytearray()
-    cur = ""
-    for bit in encoded_bits:
-        cur += bit
-        if cur in reverse_map:
-            decoded_bytes.append(reverse_map[cur])
-            cur = ""
+    if nbits == 0:
+        return b"", 0.0
+    code_vals, code_lens = codes
+    child, next_state, emit_count, emit_syms = build_decode_tables(code_vals, code_lens)
+    full_bytes, tail_bits = divmod(nbits, 8)
+    if USE_NUMBA:
+        out = np.empty(nbits, np.uint8)  # cada símbolo ocupa ao menos 1 bit
+        state, n = _decode_table_loop(np.frombuffer(bit_buffer, np.uint8, count=full_bytes),
+                                      next_state, emit_count, emit_syms, out)
+        decoded_bytes = bytearray(out[:n].tobytes())
+    else:
+        out = bytearray(nbits)
+        state, n = _decode_table_loop(bit_buffer[:full_bytes], next_state.tolist(),
+                                      emit_count.tolist(), emit_syms.tolist(), out)
+        del out[n:]
+        decoded_bytes = out
+    # bits restantes do último byte (o resto é padding)
+    if tail_bits:
+        last = bit_buffer[full_bytes]
+        for k in range(7, 7 - tail_bits, -1):
+            nxt = int(child[state, (last >> k) & 1])
+            if nxt < 0:
+                decoded_bytes.append(-nxt - 1)
+                state = 0
+            else:
+                state = nxt
     dec_time = time.perf_counter() - start
     return bytes(decoded_bytes), dec_time
 
@@ -81,13 +245,78 @@ def huffman_decompress_bits(encoded_bits: str, codes: dict):
 # ====================================================
 # Helpers: downsampling inteligente para plotting
 # ====================================================
-def downsample_df_for_plot(df: pd.DataFrame, x_col: str, max_points: int = 3000):
+@_njit
+def _lttb_indices(x, y, n_out):
+    # Largest-Triangle-Three-Buckets: em cada bucket escolhe o ponto que forma o
+    # maior triângulo com o ponto escolhido antes e a média do próximo bucket
+    n = len(x)
+    out = np.empty(n_out, np.int64)
+    out[0] = 0
+    out[n_out - 1] = n - 1
+    every = (n - 2) / (n_out - 2)
+    a = 0
+    for i in range(n_out - 2):
+        start = int((i + 1) * every) + 1
+        end = min(int((i + 2) * every) + 1, n)
+        avg_x = 0.0
+        avg_y = 0.0
+        for j in range(start, end):
+            avg_x += x[j]
+            avg_y += y[j]
+        avg_x /= end - start
+        avg_y /= end - start
+        best_area = -1.0
+        best = int(i * every) + 1
+        for j in range(int(i * every) + 1, start):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a]))
+            if area > best_area:
+                best_area = area
+                best = j
+        out[i + 1] = best
+        a = best
+    return out
+
+
+def minmax_preselect(y: np.ndarray, n_out: int, ratio: int = 4):
+    # MinMaxLTTB: reduz a entrada aos min/max de n_out * ratio / 2 blocos (vetorizado)
+    n = len(y)
+    n_bins = n_out * ratio // 2
+    block = -(-(n - 2) // n_bins)
+    inner = np.arange(1, n - 1)
+    idx = np.concatenate((inner, np.full(block * n_bins - len(inner), n - 2))).reshape(n_bins, block)
+    rows = np.arange(n_bins)
+    vals = y[idx]
+    sel = np.concatenate(([0], idx[rows, vals.argmin(axis=1)], idx[rows, vals.argmax(axis=1)], [n - 1]))
+    return np.unique(sel)
+
+
+def downsample_df_for_plot(df: pd.DataFrame, x_col: str, y_col: str = "T1", max_points: int = 3000):
     n = len(df)
     if n <= max_points:
         return df
-    # choose indices evenly spaced
-    idx = np.linspace(0, n - 1, max_points).astype(int)
-    return df.iloc[idx].reset_index(drop=True)
+    # MinMaxLTTB sobre (x_col, y_col) preserva picos; os índices escolhidos
+    # são reaplicados às demais colunas
+    x = df[x_col].to_numpy(np.float64)
+    y = df[y_col].to_numpy(np.float64)
+    cand = minmax_preselect(y, max_points) if n > 4 * max_points else np.arange(n)
+    idx = cand[_lttb_indices(x[cand], y[cand], max_points)]
+    return df.iloc[idx]
+
+
+def run_length_steps(df: pd.DataFrame, x_col: str, y_col: str, max_points: int = None):
+    # mantém só os pontos onde o sinal muda (e o primeiro/último), desenhados como degraus
+    x = df[x_col].to_numpy()
+    y = df[y_col].to_numpy()
+    if len(y) == 0:
+        return x, y
+    change = np.flatnonzero(y[1:] != y[:-1]) + 1
+    if max_points is not None and len(change) > max_points - 4:
+        # acima do orçamento: decima pulsos inteiros (pares liga/desliga), mantendo
+        # posição e largura exatas de cada pulso exibido
+        stride = -(-len(change) // max(max_points - 4, 2))
+        change = change[(np.arange(len(change)) // 2) % stride == 0]
+    keep = np.concatenate(([0], change, [len(y) - 1]))
+    return x[keep], y[keep]
 
 
 # ====================================================
@@ -98,7 +327,7 @@ st.title("🌡️ TCLab — Compressão Huffman ")
 
 st.markdown("""
 - Envie o CSV do TCLab (colunas esperadas: **Time (s)**, **T1**, **T2**, **Q1**, **Q2**).
-- O script comprime e descomprime com Huffman internamente e exibe:
+- O script comprime e descomprime com Huffman uma amostra do arquivo (até 1 MB) e exibe:
   - Gráfico de Temperaturas (T1, T2) com linhas de setpoint;
   - Gráfico de Atuadores (Q1, Q2).
 - Os sliders `T1_setpoint` e `T2_setpoint` atualizam o gráfico.
@@ -110,82 +339,132 @@ if uploaded_file is None:
     st.info("Envie um CSV para começar. O CSV deve conter a coluna 'Time (s)'.")
     st.stop()
 
-# Leitura do conteúdo do arquivo como bytes (necessário para Huffman)
-file_bytes = uploaded_file.read()
+# Leitura do conteúdo do arquivo como bytes
+file_bytes = uploaded_file.getvalue()
 original_size_bytes = len(file_bytes)
+# chave de cache: hash curto do arquivo (evita o Streamlit hashear o blob inteiro a cada rerun)
+file_key = hashlib.blake2b(file_bytes, digest_size=16).hexdigest()
 
-# Cache: compress + decompress (usa bytes como chave)
+# Huffman roda sobre uma amostra do início do arquivo: as métricas de compressão
+# continuam disponíveis, mas o custo O(N) sai do caminho dos gráficos
+HUFFMAN_SAMPLE_BYTES = 1_000_000
+sample_bytes = file_bytes[:HUFFMAN_SAMPLE_BYTES]
+sample_size_bytes = len(sample_bytes)
+
+# Cache: compress + decompress da amostra (argumentos com "_" não são hasheados pelo Streamlit)
 @st.cache_data(show_spinner=False)
-def compress_decompress_cached(file_bytes_blob: bytes):
+def compress_stats(key: str, _sample_bytes: bytes):
     # compress
-    encoded_bits, codes_map, comp_time = huffman_compress_bytes(file_bytes_blob)
-    # size em bytes (estimativa: bits -> bytes)
-    compressed_bytes_est = (len(encoded_bits) + 7) // 8
-    # decompress
-    decoded_bytes, dec_time = huffman_decompress_bits(encoded_bits, codes_map)
+    bit_buffer, nbits, codes_map, comp_time = huffman_compress_bytes(_sample_bytes)
+    # size em bytes (buffer de bits já compactado)
+    compressed_bytes_est = len(bit_buffer)
+    # decompress (codes_map None = armazenado sem Huffman)
+    if codes_map is None:
+        decoded_bytes, dec_time = bit_buffer, 0.0
+    else:
+        decoded_bytes, dec_time = huffman_decompress_bits(bit_buffer, nbits, codes_map)
     return {
-        "encoded_bits": encoded_bits,
-        "codes_map": codes_map,
+        "stored": codes_map is None,
         "comp_time": comp_time,
         "dec_time": dec_time,
         "compressed_bytes_est": compressed_bytes_est,
-        "decoded_bytes": decoded_bytes
+        "round_trip_ok": decoded_bytes == _sample_bytes
     }
 
 with st.spinner("🔧 Executando compressão/descompressão (Huffman)"):
-    info = compress_decompress_cached(file_bytes)
+    info = compress_stats(file_key, sample_bytes)
 
 # Verificações básicas
-decoded_bytes = info["decoded_bytes"]
-if decoded_bytes != file_bytes:
+if not info["round_trip_ok"]:
     st.warning("⚠️ Aviso: o conteúdo descomprimido difere do original (inconsistência detectada).")
 # tamanho e tempos
 comp_time = info["comp_time"]
 dec_time = info["dec_time"]
 compressed_bytes_est = info["compressed_bytes_est"]
-compression_ratio = 100.0 * (1 - compressed_bytes_est / max(1, original_size_bytes))
+compression_ratio = 100.0 * (1 - compressed_bytes_est / max(1, sample_size_bytes))
 
 # Exibir resumo
 st.sidebar.subheader("Resumo da Compressão")
 st.sidebar.write(f"Tamanho original: **{original_size_bytes:,}** bytes")
-st.sidebar.write(f"Tamanho comprimido (estimado): **{compressed_bytes_est:,}** bytes")
+st.sidebar.write(f"Amostra comprimida: **{sample_size_bytes:,}** bytes")
+st.sidebar.write(f"Tamanho comprimido da amostra (estimado): **{compressed_bytes_est:,}** bytes")
 st.sidebar.write(f"Redução: **{compression_ratio:.2f}%**")
+if info["stored"] and sample_size_bytes:
+    st.sidebar.write("Entropia alta: dados armazenados sem Huffman.")
 st.sidebar.write(f"Tempo compressão: **{comp_time:.3f} s**")
 st.sidebar.write(f"Tempo descompressão: **{dec_time:.3f} s**")
 
-# Construir DataFrame a partir dos bytes decodificados (assume utf-8 CSV)
-try:
-    text = decoded_bytes.decode("utf-8")
-except UnicodeDecodeError:
-    # tenta com latin1
-    text = decoded_bytes.decode("latin1")
+# Construir DataFrame tipado direto dos bytes do arquivo (sem passar pelo Huffman);
+# o CSV não muda para um mesmo upload, então parsing e conversão ficam em cache
+CSV_DTYPES = {"Time (s)": "float64", "T1": "float32", "T2": "float32", "Q1": "float32", "Q2": "float32"}
 
-df = pd.read_csv(StringIO(text))
+@st.cache_data(show_spinner=False)
+def build_dataframe(key: str, _file_bytes: bytes) -> pd.DataFrame:
+    # parsing e tipagem numa única passada vetorizada (PyArrow), direto dos bytes
+    try:
+        return pd.read_csv(BytesIO(_file_bytes), engine="pyarrow", dtype=CSV_DTYPES)
+    except (ImportError, ValueError):
+        pass
+    # fallback tolerante: sem pyarrow, ou valores não numéricos / texto não utf-8
+    try:
+        text = _file_bytes.decode("utf-8")
+    except UnicodeDecodeError:
+        # tenta com latin1
+        text = _file_bytes.decode("latin1")
+    df = pd.read_csv(StringIO(text))
+    # Garante colunas numéricas (colunas ausentes são reportadas fora do cache)
+    for col in CSV_DTYPES:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+df = build_dataframe(file_key, file_bytes)
 
 # Verifica existência da coluna Time (s)
 if "Time (s)" not in df.columns:
     st.error("O CSV precisa conter a coluna 'Time (s)'. Verifique o arquivo e reenvie.")
     st.stop()
 
-# Garante colunas numéricas
 for col in ["T1", "T2", "Q1", "Q2"]:
     if col not in df.columns:
         st.error(f"Coluna esperada '{col}' não encontrada no CSV.")
         st.stop()
-    df[col] = pd.to_numeric(df[col], errors='coerce')
 
-# Convert Time (s) para numérico (mantendo o nome)
-df["Time (s)"] = pd.to_numeric(df["Time (s)"], errors='coerce')
+# Limites usados pelos sliders (também em cache)
+@st.cache_data(show_spinner=False)
+def data_ranges(key: str, _df: pd.DataFrame):
+    return (float(_df["T1"].min()), float(_df["T1"].max()),
+            float(_df["T2"].min()), float(_df["T2"].max()),
+            int(_df["Time (s)"].min()), int(_df["Time (s)"].max()))
+
+t1_min, t1_max, t2_min, t2_max, min_time_s, max_time_s = data_ranges(file_key, df)
+
+# Atuadores ON/OFF (poucos valores distintos, inteiros 0-255, sem lacunas) são
+# plotados como degraus run-length em uint8
+@st.cache_data(show_spinner=False)
+def actuators_on_off(key: str, _df: pd.DataFrame) -> bool:
+    for q in ["Q1", "Q2"]:
+        v = _df[q]
+        if v.nunique() > 2 or v.isna().any() or not v.between(0, 255).all() or not (v % 1 == 0).all():
+            return False
+    return True
+
+q_on_off = actuators_on_off(file_key, df)
+
+# Time (s) monotônico (caso normal do TCLab) permite filtrar por busca binária
+@st.cache_data(show_spinner=False)
+def time_is_sorted(key: str, _df: pd.DataFrame) -> bool:
+    return bool(_df["Time (s)"].is_monotonic_increasing)
+
+time_sorted = time_is_sorted(file_key, df)
 
 # Sidebar: escolha de downsampling e max pontos
 st.sidebar.subheader("Performance e Visualização")
-max_points = st.sidebar.number_input("Máx pontos a plotar (downsample)", min_value=500, max_value=100000, value=3000, step=500)
+max_points = st.sidebar.number_input("Máx pontos a plotar (downsample)", min_value=500, max_value=100000, value=20000, step=500)
 auto_downsample = st.sidebar.checkbox("Ativar downsampling automático (recomendado)", value=True)
 
 # Sidebar: setpoints (sliders) — atualização em tempo real
 st.sidebar.subheader("Setpoints (T1 / T2)")
-t1_min, t1_max = float(df["T1"].min()), float(df["T1"].max())
-t2_min, t2_max = float(df["T2"].min()), float(df["T2"].max())
 
 # definir ranges um pouco mais largos para permitir setpoint fora do range atual
 pad1 = max(1.0, (t1_max - t1_min) * 0.1)
@@ -198,32 +477,38 @@ T2_setpoint = st.sidebar.slider("T2 setpoint", min_value=(t2_min - pad2), max_va
 
 # Filtro temporal opcional (por dia/hora) — se houver coluna com data, você pode implementar; aqui filtramos por intervalo de Time (s)
 st.sidebar.subheader("Filtro Time (s)")
-min_time_s = int(df["Time (s)"].min())
-max_time_s = int(df["Time (s)"].max())
 time_range = st.sidebar.slider("Intervalo Time (s)", min_value=min_time_s, max_value=max_time_s,
                                value=(min_time_s, max_time_s), step=1)
 
-# Aplica filtro de tempo
-df_filtered = df[(df["Time (s)"] >= time_range[0]) & (df["Time (s)"] <= time_range[1])].reset_index(drop=True)
+# Aplica filtro de tempo: fatia por searchsorted (O(log N)) quando Time (s) é ordenado
+if time_sorted:
+    time_arr = df["Time (s)"].to_numpy()
+    i0 = np.searchsorted(time_arr, time_range[0], side="left")
+    i1 = np.searchsorted(time_arr, time_range[1], side="right")
+    df_filtered = df.iloc[i0:i1]
+else:
+    df_filtered = df[(df["Time (s)"] >= time_range[0]) & (df["Time (s)"] <= time_range[1])]
 
 # Downsample para plot
 if auto_downsample:
     plot_df = downsample_df_for_plot(df_filtered, "Time (s)", max_points=int(max_points))
 else:
-    plot_df = df_filtered.copy()
+    plot_df = df_filtered  # somente leitura daqui em diante
 
 # Layout Principal: gráficos lado a lado
+# (valores enviados ao Plotly em float32 / uint8 para reduzir o payload JSON)
+PLOTLY_CONFIG = {"toImageButtonOptions": {"format": "png"}}
 col1, col2 = st.columns([2, 1])
 
 with col1:
     st.subheader("Temperaturas e Setpoints")
     fig_temp = go.Figure()
-    # linhas T1 e T2 (downsampled)
-    fig_temp.add_trace(go.Scatter(
-        x=plot_df["Time (s)"], y=plot_df["T1"], mode="lines", name="T1"
+    # linhas T1 e T2 (downsampled) em WebGL; setpoints (2 pontos) seguem em SVG
+    fig_temp.add_trace(go.Scattergl(
+        x=plot_df["Time (s)"], y=plot_df["T1"].to_numpy(np.float32), mode="lines", name="T1"
     ))
-    fig_temp.add_trace(go.Scatter(
-        x=plot_df["Time (s)"], y=plot_df["T2"], mode="lines", name="T2"
+    fig_temp.add_trace(go.Scattergl(
+        x=plot_df["Time (s)"], y=plot_df["T2"].to_numpy(np.float32), mode="lines", name="T2"
     ))
     # linhas de setpoint (constantes) — estendem no intervalo exibido
     x0, x1 = plot_df["Time (s)"].min(), plot_df["Time (s)"].max()
@@ -235,21 +520,31 @@ with col1:
                            xaxis_title="Time (s)",
                            yaxis_title="Temperatura (°C)",
                            height=540,
-                           hovermode="x unified")
-    st.plotly_chart(fig_temp, use_container_width=True)
+                           hovermode="x unified",
+                           dragmode="pan")
+    st.plotly_chart(fig_temp, use_container_width=True, config=PLOTLY_CONFIG)
 
 with col2:
     st.subheader("Atuadores (Q1, Q2)")
     fig_q = go.Figure()
-    fig_q.add_trace(go.Bar(x=plot_df["Time (s)"], y=plot_df["Q1"], name="Q1", marker_line_width=0))
-    fig_q.add_trace(go.Bar(x=plot_df["Time (s)"], y=plot_df["Q2"], name="Q2", marker_line_width=0))
+    if q_on_off:
+        # um ponto por transição em vez de um retângulo por amostra, com metade do
+        # limite de pontos para cada atuador
+        for q in ["Q1", "Q2"]:
+            x_q, y_q = run_length_steps(df_filtered, "Time (s)", q, max_points=int(max_points) // 2)
+            fig_q.add_trace(go.Scattergl(x=x_q, y=y_q.astype(np.uint8), mode="lines",
+                                         line_shape="hv", name=q))
+    else:
+        fig_q.add_trace(go.Bar(x=plot_df["Time (s)"], y=plot_df["Q1"].to_numpy(np.float32), name="Q1", marker_line_width=0))
+        fig_q.add_trace(go.Bar(x=plot_df["Time (s)"], y=plot_df["Q2"].to_numpy(np.float32), name="Q2", marker_line_width=0))
     fig_q.update_layout(template="plotly_dark",
                         xaxis_title="Time (s)",
                         yaxis_title="Potência (%)",
                         barmode="overlay",
                         height=540,
-                        hovermode="x unified")
-    st.plotly_chart(fig_q, use_container_width=True)
+                        hovermode="x unified",
+                        dragmode="pan")
+    st.plotly_chart(fig_q, use_container_width=True, config=PLOTLY_CONFIG)
 
 # Estatísticas e informações de performance
 st.markdown("---")
@@ -258,8 +553,8 @@ with c1:
     st.metric("Amostras (filtro)", f"{len(df_filtered):,}")
     st.metric("Amostras (plotted)", f"{len(plot_df):,}")
 with c2:
-    st.metric("Compressão (estim.)", f"{compression_ratio:.2f}%")
-    st.metric("Tamanho comprimido (bytes)", f"{compressed_bytes_est:,}")
+    st.metric("Compressão da amostra (estim.)", f"{compression_ratio:.2f}%")
+    st.metric("Amostra comprimida (bytes)", f"{compressed_bytes_est:,}")
 with c3:
     st.metric("Tempo compressão", f"{comp_time:.3f} s")
     st.metric("Tempo descompressão", f"{dec_time:.3f} s")
@@ -269,4 +564,4 @@ st.subheader("Preview dos Dados (amostra)")
 st.dataframe(df_filtered.head(200).reset_index(drop=True))
 
 st.markdown("---")
-st.caption("Observações: Huffman implementado direto no script. Para arquivos muito grandes a compressão/descompressão em memória pode ser lenta; por isso há downsampling para manter interatividade.")
+st.caption("Observações: Huffman implementado direto no script. A compressão/descompressão roda sobre uma amostra de até 1 MB e os gráficos usam o CSV completo, com downsampling para manter interatividade.")
@@ -16,6 +16,20 @@ import json
 import time
 from datetime import datetime
 
+import numpy as np
+import pandas as pd
+
+try:
+    import numba
+    USE_NUMBA = True
+except ImportError:
+    USE_NUMBA = False
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 try:
     from tclab import TCLabModel as TCLab
 
@@ -24,10 +38,15 @@ except ImportError:
     exit(1)
 
 
+FIELDS = ["time_s", "datetime", "T1", "T2", "Q1", "Q2", "SP1", "SP2"]
+BLOCK_SIZE = 60     # amostras por bloco gravado nos arquivos de saída
+FLUSH_EVERY = 3600  # amostras entre flushes dos arquivos de saída
+
+
 def parse_args():
     parser = argparse.ArgumentParser()
     parser.add_argument('--duration-days', type=float, default=7.0, help='Duração em dias (padrão: 7)')
-    parser.add_argument('--accelerate', type=float, default=1.0, help='Fator de aceleração (>1 = mais rápido)')
+    parser.add_argument('--accelerate', type=float, default=1.0, help='Fator de aceleração (>1 = mais rápido, >=1e6 = simulação em lote)')
     parser.add_argument('--deadband', type=float, default=0.5, help='Deadband °C para controle ON/OFF')
     parser.add_argument('--output-prefix', type=str, default='tclab', help='Prefixo dos arquivos')
     return parser.parse_args()
@@ -43,6 +62,89 @@ def onoff_control(temp, setpoint, deadband, last_val):
         return last_val
 
 
+def format_timestamps(t0, seconds):
+    """Timestamps ISO 8601 de t0 + seconds (amostragem de 1 s), formatados de uma vez"""
+    return np.datetime_as_string(t0 + np.asarray(seconds) * np.timedelta64(1, 's'), unit='us')
+
+
+def _njit(func):
+    # compila com Numba quando disponível; caso contrário roda em Python puro
+    return numba.njit(cache=True)(func) if USE_NUMBA else func
+
+
+@_njit
+def simulate_onoff(sp1, sp2, deadband, noise1, noise2):
+    """Modelo térmico do TCLabModel (Euler, passo 0.2 s) com controle ON/OFF, 1 amostra/s"""
+    n = len(sp1)
+    T1 = np.empty(n)
+    T2 = np.empty(n)
+    Q1 = np.empty(n, np.int64)
+    Q2 = np.empty(n, np.int64)
+    Ta, P1, P2 = 21.0, 200.0, 100.0
+    H1, H2, S1, S2 = Ta, Ta, Ta, Ta
+    q1, q2 = 0, 0
+    for t in range(n):
+        # leitura com ruído e quantização do A/D, como TCLabModel.measurement
+        m1 = max(-50.0, min(132.2, (S1 + noise1[t]) - (S1 + noise1[t]) % 0.3223))
+        m2 = max(-50.0, min(132.2, (S2 + noise2[t]) - (S2 + noise2[t]) % 0.3223))
+        if m1 < sp1[t] - deadband:
+            q1 = 100
+        elif m1 > sp1[t] + deadband:
+            q1 = 0
+        if m2 < sp2[t] - deadband:
+            q2 = 100
+        elif m2 > sp2[t] + deadband:
+            q2 = 0
+        T1[t], T2[t], Q1[t], Q2[t] = m1, m2, q1, q2
+        for _ in range(5):
+            dH1 = P1 * q1 / 5720 + (Ta - H1) / 20 - (H1 - H2) / 100
+            dH2 = P2 * q2 / 5720 + (Ta - H2) / 20 + (H1 - H2) / 100
+            dS1 = (H1 - S1) / 140
+            dS2 = (H2 - S2) / 140
+            H1 += 0.2 * dH1
+            H2 += 0.2 * dH2
+            S1 += 0.2 * dS1
+            S2 += 0.2 * dS2
+    return T1, T2, Q1, Q2
+
+
+def simulate_batch(total_seconds, deadband):
+    """Simulação sem restrição de tempo real: setpoints vetorizados + modelo compilado"""
+    t = np.arange(total_seconds)
+    # alterna setpoints a cada 12 horas
+    sp1 = 25 + 5 * ((t // 43200) % 2)
+    sp2 = 23 + 5 * ((t // 43200) % 2)
+    rng = np.random.default_rng()
+    T1, T2, Q1, Q2 = simulate_onoff(sp1, sp2, deadband,
+                                    rng.normal(0, 0.043, total_seconds),
+                                    rng.normal(0, 0.043, total_seconds))
+    return pd.DataFrame({
+        "time_s": t,
+        "datetime": format_timestamps(np.datetime64(datetime.now(), 'us'), t),
+        "T1": T1,
+        "T2": T2,
+        "Q1": Q1,
+        "Q2": Q2,
+        "SP1": sp1,
+        "SP2": sp2
+    })
+
+
+def json_line(row):
+    """Codifica um registro como uma linha JSONL (orjson quando disponível)"""
+    if orjson is not None:
+        return orjson.dumps(row) + b"\n"
+    return (json.dumps(row) + "\n").encode()
+
+
+def write_block(block, t0, writer, jf):
+    """Grava um bloco de amostras (sem timestamp) no CSV e no JSONL"""
+    stamps = format_timestamps(t0, [r[0] for r in block]).tolist()
+    rows = [(r[0], stamp) + r[1:] for r, stamp in zip(block, stamps)]
+    writer.writerows(rows)
+    jf.write(b"".join(json_line(dict(zip(FIELDS, r))) for r in rows))
+
+
 def main():
     args = parse_args()
     total_seconds = int(args.duration_days * 24 * 3600)
@@ -50,13 +152,21 @@ def main():
 
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     csv_file = f"{args.output_prefix}_{timestamp}.csv"
-    json_file = f"{args.output_prefix}_{timestamp}.json"
+    json_file = f"{args.output_prefix}_{timestamp}.jsonl"
 
     print(f"Modo simulado ativado (sem Arduino físico)")
     print(f"Simulação de {args.duration_days} dias ({total_seconds} segundos simulados)")
     print(f"Acelerando {args.accelerate}x -> tempo real por amostra: {sleep_real:.4f}s")
 
-    rows = []
+    if os.environ.get("TCLAB_SIMULATE") and args.accelerate >= 1e6:
+        # sem tempo real a respeitar: simula tudo em lote e grava de uma vez
+        df = simulate_batch(total_seconds, args.deadband)
+        df.to_csv(csv_file, index=False)
+        # mesmo codificador do laço em tempo real (to_json arredondaria os floats)
+        with open(json_file, 'wb') as jf:
+            jf.write(b"".join(json_line(row) for row in df.to_dict("records")))
+        print(f"Arquivos gerados: {csv_file}, {json_file}")
+        return
 
     # inicializa TCLab em modo simulado
     lab = TCLab()
@@ -64,53 +174,52 @@ def main():
     lab.Q2(0)
     last_q1, last_q2 = 0, 0
 
-    try:
-        for t in range(total_seconds):
-            T1, T2 = lab.T1, lab.T2
-
-            # alterna setpoints a cada 12 horas
-            sp1 = 25 + 5 * ((t // 43200) % 2)
-            sp2 = 23 + 5 * ((t // 43200) % 2)
-
-            q1 = onoff_control(T1, sp1, args.deadband, last_q1)
-            q2 = onoff_control(T2, sp2, args.deadband, last_q2)
-            lab.Q1(q1)
-            lab.Q2(q2)
-
-            last_q1, last_q2 = q1, q2
-
-            rows.append({
-                "time_s": t,
-                "datetime": datetime.now().isoformat(),
-                "T1": T1,
-                "T2": T2,
-                "Q1": q1,
-                "Q2": q2,
-                "SP1": sp1,
-                "SP2": sp2
-            })
-
-            if t % 100 == 0:
-                print(f"[{t}/{total_seconds}] T1={T1:.2f}C, T2={T2:.2f}C, SP1={sp1}, SP2={sp2}")
-
-            time.sleep(sleep_real)
-
-    except KeyboardInterrupt:
-        print("\nSimulação interrompida pelo usuário.")
-    finally:
-        lab.Q1(0)
-        lab.Q2(0)
-        lab.close()
-
-    # salva CSV
-    with open(csv_file, 'w', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=rows[0].keys())
-        writer.writeheader()
-        writer.writerows(rows)
-
-    # salva JSON
-    with open(json_file, 'w') as f:
-        json.dump(rows, f, indent=2)
+    # timestamps derivados de t0 (1 amostra/s), formatados por bloco ao gravar
+    t0 = np.datetime64(datetime.now(), 'us')
+    block = []
+
+    # grava CSV e JSONL em blocos durante a simulação (uma interrupção deixa arquivos parciais válidos)
+    with open(csv_file, 'w', newline='') as f, open(json_file, 'wb') as jf:
+        writer = csv.writer(f)
+        writer.writerow(FIELDS)
+        try:
+            for t in range(total_seconds):
+                T1, T2 = lab.T1, lab.T2
+
+                # alterna setpoints a cada 12 horas
+                sp1 = 25 + 5 * ((t // 43200) % 2)
+                sp2 = 23 + 5 * ((t // 43200) % 2)
+
+                q1 = onoff_control(T1, sp1, args.deadband, last_q1)
+                q2 = onoff_control(T2, sp2, args.deadband, last_q2)
+                lab.Q1(q1)
+                lab.Q2(q2)
+
+                last_q1, last_q2 = q1, q2
+
+                block.append((t, T1, T2, q1, q2, sp1, sp2))
+                if len(block) == BLOCK_SIZE:
+                    # desacopla o buffer antes de gravar: o finally só vê amostras nunca gravadas
+                    pending, block = block, []
+                    write_block(pending, t0, writer, jf)
+
+                if t % FLUSH_EVERY == 0:
+                    f.flush()
+                    jf.flush()
+
+                if t % 100 == 0:
+                    print(f"[{t}/{total_seconds}] T1={T1:.2f}C, T2={T2:.2f}C, SP1={sp1}, SP2={sp2}")
+
+                time.sleep(sleep_real)
+
+        except KeyboardInterrupt:
+            print("\nSimulação interrompida pelo usuário.")
+        finally:
+            lab.Q1(0)
+            lab.Q2(0)
+            lab.close()
+            if block:
+                write_block(block, t0, writer, jf)
 
     print(f"Arquivos gerados: {csv_file}, {json_file}")
 